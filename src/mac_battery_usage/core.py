@@ -3,26 +3,30 @@ Simple module that parses the macOS `pmset -g log` to get usage information to g
 
 Note that this is an approximation and may change between versions of macOS.
 """
-import io as _io
+import math as _math
 import re as _re
 import subprocess as _subprocess
 import collections.abc as _coll_types
+import itertools as _itertools
 
 
 from contextlib import contextmanager
-from dataclasses import dataclass
-from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from typing import ClassVar
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 
 _TIMESTAMP_PAT_STR = r"(?P<timestamp>\d{4}-\d{2}-\d{2}\s\d{2}:\d{2}:\d{2}\s[+-]\d{4})"
-_CHARGE_PAT = _re.compile(
+# a single pattern for both charge and display lines, which branch matched is determined by the populated groups
+_EVENT_PAT = _re.compile(
     _TIMESTAMP_PAT_STR
-    + r".*?Using (?P<type>AC|Batt|BATT).*?\(Charge:\s*(?P<charge>\d+)[%)]",
+    + r".*?(?:Using (?P<type>AC|Batt|BATT).*?\(Charge:\s*(?P<charge>\d+)[%)]"
+    + r"|Display is turned (?P<state>\w+))",
     _re.IGNORECASE,
 )
-_DISPLAY_PAT = _re.compile(
-    _TIMESTAMP_PAT_STR + r".*?Display is turned (?P<state>\w+)", _re.IGNORECASE
-)
+# literal text that any line matching `_EVENT_PAT` must contain
+_CHARGE_LINE_TEXT = "Using"
+_DISPLAY_LINE_TEXT = "Display is turned"
 
 
 class ChargeType(Enum):
@@ -35,20 +39,34 @@ class DisplayState(Enum):
     ON = 1
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ChargeEvent:
+    KIND: ClassVar[int] = 0
+
     ts: datetime
     type: ChargeType
     charge: int
+    # POSIX timestamp of `ts` so that interval arithmetic is plain float subtraction
+    ts_epoch: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "ts_epoch", self.ts.timestamp())
 
     def __str__(self):
         return f"{ts_to_str(self.ts)}, {self.type.name}, {self.charge}%"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DisplayEvent:
+    KIND: ClassVar[int] = 1
+
     ts: datetime
     state: DisplayState
+    # POSIX timestamp of `ts` so that interval arithmetic is plain float subtraction
+    ts_epoch: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "ts_epoch", self.ts.timestamp())
 
     def __str__(self):
         return f"{ts_to_str(self.ts)}, Display {self.state.name}"
@@ -58,64 +76,95 @@ def ts_to_str(ts: datetime):
     return ts.strftime("%Y-%m-%d %H:%M:%S")
 
 
+# parsed `+HHMM`/`-HHMM` offsets, logs generally only have one or two distinct offsets
+_TZ_CACHE: dict[str, timezone] = {}
+
+
+def _parse_tz(tz_text: str) -> timezone:
+    tz = _TZ_CACHE.get(tz_text)
+    if tz is None:
+        sign = tz_text[0]
+        tz = timezone(
+            timedelta(hours=int(sign + tz_text[1:3]), minutes=int(sign + tz_text[3:5]))
+        )
+        _TZ_CACHE[tz_text] = tz
+    return tz
+
+
 def parse_ts(ts_text: str) -> datetime:
-    """Parses the `pmset` log formatted timestamp into a local `datetime`"""
-    return datetime.strptime(ts_text, "%Y-%m-%d %H:%M:%S %z")
+    """Parses the `pmset` log formatted timestamp into a local `datetime`
+
+    The timestamp is in the fixed `YYYY-MM-DD HH:MM:SS +HHMM` layout, so the fields are sliced out directly
+    as `datetime.strptime` is comparatively slow for this.
+    """
+    return datetime(
+        int(ts_text[0:4]),
+        int(ts_text[5:7]),
+        int(ts_text[8:10]),
+        int(ts_text[11:13]),
+        int(ts_text[14:16]),
+        int(ts_text[17:19]),
+        tzinfo=_parse_tz(ts_text[20:25]),
+    )
 
 
 _EVENT_TYPE = ChargeEvent | DisplayEvent
 
+# the spellings that `pmset` actually logs, anything else falls back to the case-insensitive enum lookup
+_CHARGE_TYPE_TEXT = {
+    "AC": ChargeType.AC,
+    "Batt": ChargeType.BATT,
+    "BATT": ChargeType.BATT,
+}
+_DISPLAY_STATE_TEXT = {
+    "on": DisplayState.ON,
+    "off": DisplayState.OFF,
+}
+
 
 def parse_log(
-    log_lines: _coll_types.Iterator[str],
-) -> list[_EVENT_TYPE]:
-    events = []
+    log_lines: _coll_types.Iterable[str],
+) -> _coll_types.Iterator[_EVENT_TYPE]:
+    """Lazily parses the charge and display events out of `pmset -g log` lines"""
+    # bind the per-line lookups locally
+    event_match = _EVENT_PAT.match
+    charge_line_text = _CHARGE_LINE_TEXT
+    display_line_text = _DISPLAY_LINE_TEXT
     for line in log_lines:
-        # is this a charge line?
-        match = _CHARGE_PAT.match(line)
-        if match:
-            charge_text = match["type"].upper()
-            charge_type = ChargeType[charge_text]
-            ts = parse_ts(match["timestamp"])
-            charge_amount = int(match["charge"])
-            events.append(ChargeEvent(ts, charge_type, charge_amount))
+        # cheap substring pre-filter as the vast majority of the log is neither a charge nor display line
+        if charge_line_text not in line and display_line_text not in line:
             continue
-
-        # TODO probably could refactor this into one match
-        # is this a display line?
-        match = _DISPLAY_PAT.match(line)
+        match = event_match(line)
         if not match:
             continue
-        ts = parse_ts(match["timestamp"])
-        display_text = match["state"].upper()
-        display_state = DisplayState[display_text]
-        events.append(DisplayEvent(ts, display_state))
-    return events
-
-
-_GREP_ARGS = (
-    "grep",
-    "-e",
-    "[[:blank:]]Using[[:blank:]]",
-    "-e",
-    "[[:blank:]]Display is turned[[:blank:]]",
-)
+        # groups are positional in `_EVENT_PAT`: timestamp, type, charge, state
+        ts_text, charge_text, charge_amount_text, display_text = match.groups()
+        ts = parse_ts(ts_text)
+        if charge_text is not None:
+            charge_type = _CHARGE_TYPE_TEXT.get(charge_text)
+            if charge_type is None:
+                charge_type = ChargeType[charge_text.upper()]
+            yield ChargeEvent(ts, charge_type, int(charge_amount_text))
+        else:
+            display_state = _DISPLAY_STATE_TEXT.get(display_text)
+            if display_state is None:
+                display_state = DisplayState[display_text.upper()]
+            yield DisplayEvent(ts, display_state)
+
+
 _PMSET_LOG_ARGS = ("pmset", "-g", "log")
 
 
 def pmset_log_proc() -> _subprocess.Popen:
-    """Runs `pmset -g log` pre-filtering lines with `grep` and returns the `Popen` object"""
-    pmset_proc = _subprocess.Popen(_PMSET_LOG_ARGS, stdout=_subprocess.PIPE)
-    grep_proc = _subprocess.Popen(
-        _GREP_ARGS, encoding="UTF-8", stdin=pmset_proc.stdout, stdout=_subprocess.PIPE
-    )
-    return grep_proc
+    """Runs `pmset -g log` and returns the `Popen` object, lines are filtered by `parse_log`"""
+    return _subprocess.Popen(_PMSET_LOG_ARGS, encoding="UTF-8", stdout=_subprocess.PIPE)
 
 
 @contextmanager
-def pmset_log() -> _coll_types.Generator[_coll_types.Iterator[str], None, None]:
+def pmset_log() -> _coll_types.Generator[list[str], None, None]:
+    """Yields the lines of `pmset -g log`, the output is read in one shot rather than line by line"""
     with pmset_log_proc() as p:
-        yield p.stdout
+        yield p.stdout.read().splitlines()
 
 
 _PMSET_PS_ARGS = ("pmset", "-g", "ps")
@@ -123,30 +172,72 @@ _PMSET_PS_PATT = _re.compile(
     r"Now drawing from '(?P<source>[^']+)'.*?(?P<charge>\d+)%",
     _re.DOTALL | _re.MULTILINE | _re.IGNORECASE,
 )
+_PMSET_PS_SOURCE_PREFIX = "Now drawing from '"
 
 
-def pmset_ps() -> ChargeEvent:
-    text = _subprocess.check_output(_PMSET_PS_ARGS, encoding="UTF-8")
-    match = _PMSET_PS_PATT.search(text)
-    if not match:
-        raise Exception("Could not determine battery status")
+def pmset_ps_proc() -> _subprocess.Popen:
+    """Runs `pmset -g ps` and returns the `Popen` object"""
+    return _subprocess.Popen(_PMSET_PS_ARGS, encoding="UTF-8", stdout=_subprocess.PIPE)
 
-    charge_type = (
-        ChargeType.BATT if match["source"] == "Battery Power" else ChargeType.AC
-    )
-    charge = int(match["charge"])
+
+def pmset_ps(proc: _subprocess.Popen | None = None) -> ChargeEvent:
+    """Returns the current charge state from `pmset -g ps`.
+
+    `proc` may be an already started `pmset_ps_proc()`, so that `pmset` can run while other work is done.
+    """
+    if proc is None:
+        proc = pmset_ps_proc()
+    with proc:
+        text, _ = proc.communicate()
+    if proc.returncode != 0:
+        raise _subprocess.CalledProcessError(proc.returncode, proc.args, text)
+    return parse_ps(text)
+
+
+def _find_ps_source_charge(text: str) -> tuple[str, int] | None:
+    """Fast path for the usual `pmset -g ps` layout that only uses `str.find`"""
+    source_start = text.find(_PMSET_PS_SOURCE_PREFIX)
+    if source_start < 0:
+        return None
+    source_start += len(_PMSET_PS_SOURCE_PREFIX)
+    source_end = text.find("'", source_start)
+    if source_end <= source_start:
+        return None
+    charge_end = text.find("%", source_end + 1)
+    if charge_end < 0:
+        return None
+    charge_start = charge_end
+    while charge_start > source_end + 1 and text[charge_start - 1].isdigit():
+        charge_start -= 1
+    if charge_start == charge_end:
+        return None
+    return text[source_start:source_end], int(text[charge_start:charge_end])
+
+
+def parse_ps(text: str) -> ChargeEvent:
+    """Parses the output of `pmset -g ps` into a `ChargeEvent` for now"""
+    source_charge = _find_ps_source_charge(text)
+    if source_charge is None:
+        match = _PMSET_PS_PATT.search(text)
+        if not match:
+            raise Exception("Could not determine battery status")
+        source_charge = match["source"], int(match["charge"])
+
+    source, charge = source_charge
+    charge_type = ChargeType.BATT if source == "Battery Power" else ChargeType.AC
     return ChargeEvent(datetime.now().astimezone(), charge_type, charge)
 
 
+_SECONDS_IN_DAY = 86400
 _SECONDS_IN_HOUR = 3600
 _SECONDS_IN_MINUTE = 60
 
 
 def format_secs(total_secs: float) -> str:
-    td = timedelta(seconds=total_secs)
-    hours, min_secs = divmod(td.seconds, _SECONDS_IN_HOUR)
+    days, day_secs = divmod(int(total_secs), _SECONDS_IN_DAY)
+    hours, min_secs = divmod(day_secs, _SECONDS_IN_HOUR)
     minutes = min_secs // _SECONDS_IN_MINUTE
-    return f"{td.days:>2}d {hours:02}h {minutes:02}m"
+    return f"{days:>2}d {hours:02}h {minutes:02}m"
 
 
 _DISPLAY_TEXT_MAPPING = {
@@ -157,7 +248,7 @@ _DISPLAY_TEXT_MAPPING = {
 }
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class UsageSession:
     """A session of battery or charging.
 
@@ -182,17 +273,16 @@ class UsageSession:
 
     @property
     def duration_secs(self):
-        return (self.end_event.ts - self.start_event.ts).total_seconds()
-
-    def pretty_str(self) -> str:
-        buf = _io.StringIO()
-        print(
-            f"{_DISPLAY_TEXT_MAPPING[self.start_event.type]} session",
-            f"at {ts_to_str(self.start_event.ts)}",
-            f"for {format_secs(self.duration_secs)}",
-            f"from {float(self.start_event.charge):3.0f}%",
-            file=buf,
-        )
+        return self.end_event.ts_epoch - self.start_event.ts_epoch
+
+    def pretty_lines(self) -> tuple[str, str, str]:
+        """The session summary line followed by the screen on and screen off usage lines."""
+        lines = [
+            f"{_DISPLAY_TEXT_MAPPING[self.start_event.type]} session"
+            f" at {ts_to_str(self.start_event.ts)}"
+            f" for {format_secs(self.duration_secs)}"
+            f" from {float(self.start_event.charge):3.0f}%"
+        ]
         for display_type in (DisplayState.ON, DisplayState.OFF):
             idx = display_type.value
             usage_secs = self.display_usage_secs[idx]
@@ -207,14 +297,16 @@ class UsageSession:
                 usage_est_hours_text = ""
             else:
                 usage_est_secs = (100.0 / abs(usage_rate)) * _SECONDS_IN_HOUR
-                usage_est_hours_text = f"(≅{format_secs(usage_est_secs)} per charge)"
-            print(
-                f"Screen {_DISPLAY_TEXT_MAPPING[display_type].lower():3} {usage_text}",
-                f"{abs(usage_charge):2.0f}% battery during {format_secs(usage_secs):10}",
-                f"at {abs(usage_rate):4.1f}%/h {usage_est_hours_text}",
-                file=buf,
+                usage_est_hours_text = f" (≅{format_secs(usage_est_secs)} per charge)"
+            lines.append(
+                f"Screen {_DISPLAY_TEXT_MAPPING[display_type].lower():3} {usage_text}"
+                f" {abs(usage_charge):2.0f}% battery during {format_secs(usage_secs):10}"
+                f" at {abs(usage_rate):4.1f}%/h{usage_est_hours_text}"
             )
-        return buf.getvalue().strip()
+        return tuple(lines)
+
+    def pretty_str(self) -> str:
+        return "\n".join(self.pretty_lines())
 
     def __str__(self):
         return (
@@ -224,6 +316,10 @@ class UsageSession:
         )
 
 
+# enables internal consistency checks in the aggregation, which otherwise cost time per charge event
+_DEBUG_CHECKS = False
+
+
 class UsageAggregator(object):
     """Stores an aggregate for a battery session--a period of time off of AC"""
 
@@ -233,16 +329,19 @@ class UsageAggregator(object):
     __pending_usage_secs: list[float]
     __prev_charge_event: ChargeEvent
     __prev_display_event: DisplayEvent
+    __event_handlers: tuple[_coll_types.Callable[[_EVENT_TYPE], UsageSession | None]]
 
     def __init__(self, charge_event: ChargeEvent, display_event: DisplayEvent):
         """Constructs the aggregator with the seed events.
 
-        The expectation is that the `charge_event` is the first AC event and the `display_event` is the first
-        known event.
+        The expectation is that the `charge_event` is the first AC/battery transition and the `display_event` is
+        the closest known display event before it.
         """
         self.__new_session(charge_event)
         self.__prev_charge_event = charge_event
         self.__prev_display_event = display_event
+        # indexed by the event's `KIND`
+        self.__event_handlers = (self.__add_charge_event, self.__add_display_event)
 
     def __new_session(self, session_start_event: ChargeEvent):
         self.__session_start_event = session_start_event
@@ -279,47 +378,52 @@ class UsageAggregator(object):
         d_ts = self.__prev_display_event.ts
         return c_ts if c_ts > d_ts else d_ts
 
+    @property
+    def __prev_ts_epoch(self) -> float:
+        c_ts = self.__prev_charge_event.ts_epoch
+        d_ts = self.__prev_display_event.ts_epoch
+        return c_ts if c_ts > d_ts else d_ts
+
     @property
     def total_pending_time(self):
         return sum(self.__pending_usage_secs)
 
     def add_event(self, event: _EVENT_TYPE) -> UsageSession | None:
-        if isinstance(event, ChargeEvent):
-            return self.__add_charge_event(event)
-        if isinstance(event, DisplayEvent):
-            return self.__add_display_event(event)
-        raise TypeError(f"Could not add event for: {type(event)}")
+        try:
+            handler = self.__event_handlers[event.KIND]
+        except AttributeError:
+            raise TypeError(f"Could not add event for: {type(event)}") from None
+        return handler(event)
 
     def __add_charge_event(self, event: ChargeEvent) -> UsageSession | None:
         result = None
-        prev_charge_ts = self.__prev_charge_event.ts
-        curr_ts = event.ts
+        prev_charge_ts = self.__prev_charge_event.ts_epoch
+        curr_ts = event.ts_epoch
         prev_charge_type = self.charge_type
         prev_charge = self.charge
         curr_charge = event.charge
         # flush the pending times with the current amount of charge
         # if there are screen on/off events and no charge events in the interval, we just average out the usage
         window_charge_usage = -(curr_charge - prev_charge)
-        window_time = (curr_ts - prev_charge_ts).total_seconds()
-        pending_time = (curr_ts - self.prev_ts).total_seconds()
+        window_time = curr_ts - prev_charge_ts
+        pending_time = curr_ts - self.__prev_ts_epoch
         # add in pending time with display
         self.__pending_usage_secs[self.display_state.value] += pending_time
-        session_time = (curr_ts - self.__session_start_event.ts).total_seconds()
-        assert (
-            self.total_pending_time == window_time
-        ), f"p_time({self.total_pending_time}) != w_time({session_time})"
-        pending_charge_usages = list(
-            0 if pending_time == 0 else window_charge_usage * (usage_secs / window_time)
-            for usage_secs in self.__pending_usage_secs
-        )
-        self.__session_usage_secs = list(
-            x + y for x, y in zip(self.__session_usage_secs, self.__pending_usage_secs)
-        )
-        self.__session_charge_usages = list(
-            x + y for x, y in zip(self.__session_charge_usages, pending_charge_usages)
-        )
-        # reset pending
-        self.__pending_usage_secs = [0.0, 0.0]
+        if _DEBUG_CHECKS:
+            assert _math.isclose(
+                self.total_pending_time, window_time
+            ), f"p_time({self.total_pending_time}) != w_time({window_time})"
+        # fold the pending usage into the session in place and reset pending
+        pending_usage_secs = self.__pending_usage_secs
+        session_usage_secs = self.__session_usage_secs
+        session_charge_usages = self.__session_charge_usages
+        # the window's charge is attributed to each display state by its share of the window's time
+        charge_per_sec = 0.0 if pending_time == 0 else window_charge_usage / window_time
+        for idx in range(len(pending_usage_secs)):
+            usage_secs = pending_usage_secs[idx]
+            session_usage_secs[idx] += usage_secs
+            session_charge_usages[idx] += charge_per_sec * usage_secs
+            pending_usage_secs[idx] = 0.0
 
         # flush a session on transition from one type to another
         if prev_charge_type != event.type:
@@ -331,46 +435,53 @@ class UsageAggregator(object):
 
     def __add_display_event(self, event: DisplayEvent) -> None:
         # record the previous usage up until now
-        secs = (event.ts - self.prev_ts).total_seconds()
+        secs = event.ts_epoch - self.__prev_ts_epoch
         self.__pending_usage_secs[self.display_state.value] += secs
         self.__prev_display_event = event
 
 
 def calculate_usage(
-    events: _coll_types.Sequence[_EVENT_TYPE],
+    events: _coll_types.Iterable[_EVENT_TYPE],
 ) -> _coll_types.Sequence[UsageSession]:
     """Aggregates an event log into usage stats per session.
 
     The last event in the log is assumed to be the known open "end" of the log, so in general it will be a charge event
     and will be used to flush the current stat for that active session.
+
+    The events are consumed in a single pass, so they may be streamed directly from `parse_log`.
     """
-    # first we must find the first for charge events (so we know where the start is), and the "closest" display
-    # state before that
+    events = iter(events)
+    # first we must find the first transition between charge types (so we know where a session starts), and the
+    # "closest" display state before that
     prev_charge_type = None
     start_charge_event = None
     start_display_event = None
-    for i, event in enumerate(events):
-        if isinstance(event, DisplayEvent):
+    display_kind = DisplayEvent.KIND
+    charge_kind = ChargeEvent.KIND
+    for event in events:
+        kind = event.KIND
+        if kind == display_kind:
             # just remember the closest display event before our potential charge event
             start_display_event = event
             continue
-        if isinstance(event, ChargeEvent):
-            if prev_charge_type is not None:
-                # first charge event
-                prev_charge_type = event.type
-                continue
-            if prev_charge_type != event.type:
-                # we have a transition, so we know this is a start
+        if kind == charge_kind:
+            if (
+                prev_charge_type is not None
+                and prev_charge_type != event.type
+                and start_display_event is not None
+            ):
+                # we have a transition with a known display state, so we know this is a start
                 start_charge_event = event
-                if start_display_event is not None and start_charge_event is not None:
-                    break
-                continue
+                break
+            prev_charge_type = event.type
     else:
         raise Exception("Could not find any start of AC/Battery session in log events")
     aggregator = UsageAggregator(start_charge_event, start_display_event)
     stats: list[UsageSession] = []
-    for event in events[i:]:
-        stat = aggregator.add_event(event)
+    # continue with the events after the start, bind the per-event call once
+    add_event = aggregator.add_event
+    for event in events:
+        stat = add_event(event)
         if stat is not None:
             stats.append(stat)
     # make sure the "partial session" at the end gets captured
@@ -384,11 +495,12 @@ _MIN_PERCENTAGE_USAGE = 1.0
 
 def battery_usage_stats() -> _coll_types.Iterator[UsageSession]:
     """Returns a filtered iterator of `UsageSession` for battery sessions"""
-    with pmset_log() as log:
-        events = parse_log(log)
-    # add in current charge state
-    events.append(pmset_ps())
-    stats = calculate_usage(events)
+    # start `pmset -g ps` first so that it runs concurrently with `pmset -g log`
+    ps_proc = pmset_ps_proc()
+    with ps_proc, pmset_log() as log:
+        # stream the parsed log with the current charge state appended
+        events = _itertools.chain(parse_log(log), (pmset_ps(ps_proc),))
+        stats = calculate_usage(events)
     for i, stat in enumerate(stats):
         # only generate out stats that have some reasonable amount of time or used battery
         # also emit a stat if the last stat is on battery (implying we're on battery)
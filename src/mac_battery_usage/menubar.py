@@ -1,13 +1,17 @@
 """Menubar application for macOS battery usage"""
-import rumps
 import rumps as _rumps
-import concurrent.futures as _futures
+import queue as _queue
+import threading as _threading
+import time as _time
 import Cocoa as _cocoa
 import AppKit as _appkit
+import objc as _objc
 
 from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
+from PyObjCTools import AppHelper
+from PyObjCTools.Conversion import propertyListFromPythonCollection
 
 from . import core as _core
 
@@ -19,8 +23,18 @@ _STAT_LEN = 5
 _PLACEHOLDER_TEXT = " " * 84
 
 
+# the epoch second and text of the last `now_str`, the text only has second granularity
+_now_str_cache: tuple[int, str] = (-1, "")
+
+
 def now_str() -> str:
-    return _core.ts_to_str(datetime.now().astimezone())
+    global _now_str_cache
+    now = _time.time()
+    now_secs = int(now)
+    if _now_str_cache[0] != now_secs:
+        now_text = _core.ts_to_str(datetime.fromtimestamp(now).astimezone())
+        _now_str_cache = (now_secs, now_text)
+    return _now_str_cache[1]
 
 
 class Color(Enum):
@@ -28,60 +42,101 @@ class Color(Enum):
     BLUE = _cocoa.NSColor.systemBlueColor()
 
 
-@dataclass
-class FetchResult:
-    charge_event: _core.ChargeEvent
-    stat_lines: list[str]
+# the font and attributes of formatted menu items never change, so build them once per color
+_FONT = _cocoa.NSFont.fontWithName_size_("Monaco", 12.0)
 
 
-def update_formatted_menu_item(
-    menu_item: _rumps.MenuItem, text: str, color: Color = Color.BLUE
-):
-    """Updates the text of a menu item with formatted text."""
+def _text_attributes(color: Color):
     # Adapted from https://github.com/jaredks/rumps/issues/30#issuecomment-70348881
-    from PyObjCTools.Conversion import propertyListFromPythonCollection
-
-    font = _cocoa.NSFont.fontWithName_size_("Monaco", 12.0)
-    attributes = propertyListFromPythonCollection(
+    return propertyListFromPythonCollection(
         {
-            _cocoa.NSFontAttributeName: font,
+            _cocoa.NSFontAttributeName: _FONT,
             _cocoa.NSForegroundColorAttributeName: color.value,
         },
         conversionHelper=lambda x: x,
     )
 
+
+_TEXT_ATTRIBUTES = {color: _text_attributes(color) for color in Color}
+# all placeholder menu items share the same immutable attributed string
+_PLACEHOLDER_STRING = _appkit.NSAttributedString.alloc().initWithString_attributes_(
+    _PLACEHOLDER_TEXT, _TEXT_ATTRIBUTES[Color.BLUE]
+)
+
+
+@dataclass(slots=True, frozen=True)
+class FetchResult:
+    charge_event: _core.ChargeEvent
+    stat_lines: list[str]
+
+
+def update_formatted_menu_item(
+    menu_item: _rumps.MenuItem, text: str, color: Color = Color.BLUE
+):
+    """Updates the text of a menu item with formatted text."""
     string = _appkit.NSAttributedString.alloc().initWithString_attributes_(
-        text, attributes
+        text, _TEXT_ATTRIBUTES[color]
     )
     menu_item._menuitem.setAttributedTitle_(string)
 
 
-def formatted_menu_item(text) -> rumps.MenuItem:
-    """Creates a menu item with formatted text."""
+def placeholder_menu_item() -> _rumps.MenuItem:
+    """Creates a menu item with the formatted placeholder text."""
     menu_item = _rumps.MenuItem("")
-    update_formatted_menu_item(menu_item, text)
+    menu_item._menuitem.setAttributedTitle_(_PLACEHOLDER_STRING)
     return menu_item
 
 
+# how long a fetched result is reused for, so that rapid refreshes don't re-run `pmset`
+_FETCH_CACHE_SECS = 10.0
+# the monotonic time and result of the last successful fetch
+_fetch_cache: tuple[float, FetchResult] | None = None
+
+
 def fetch_stats() -> FetchResult:
+    global _fetch_cache
+    if _fetch_cache is not None:
+        fetched_at, result = _fetch_cache
+        if _time.monotonic() - fetched_at < _FETCH_CACHE_SECS:
+            return result
+
     stats = list(_core.battery_usage_stats())
     if len(stats) == 0:
         raise Exception("No battery usage sessions")
     # display from newest to oldest
     stats = list(reversed(stats[-_STAT_LEN:]))
-    lines = []
+    # slots without a stat keep the placeholder text
+    lines = [_PLACEHOLDER_TEXT] * (_STAT_LEN * _STAT_TEXT_LEN)
     for i, stat in enumerate(stats):
-        stat_lines = stat.pretty_str().split("\n")
-        if len(stat_lines) != _STAT_TEXT_LEN:
-            raise Exception(f"Malformed battery stats line length: {len(stat_lines)}")
-        lines.extend(stat_lines)
-    for i in range((_STAT_LEN - len(stats)) * _STAT_TEXT_LEN):
-        lines.append(_PLACEHOLDER_TEXT)
+        start = i * _STAT_TEXT_LEN
+        lines[start : start + _STAT_TEXT_LEN] = stat.pretty_lines()
     assert len(lines) == _STAT_LEN * _STAT_TEXT_LEN
-    return FetchResult(charge_event=_core.pmset_ps(), stat_lines=lines)
+    result = FetchResult(charge_event=_core.pmset_ps(), stat_lines=lines)
+    _fetch_cache = (_time.monotonic(), result)
+    return result
+
+
+class MenuVisibilityDelegate(_appkit.NSObject):
+    """`NSMenu` delegate that tracks whether the menu is open and calls back just before it opens."""
+
+    def initWithOpenCallback_(self, open_callback):
+        self = _objc.super(MenuVisibilityDelegate, self).init()
+        if self is None:
+            return None
+        self.open_callback = open_callback
+        self.is_open = False
+        return self
+
+    def menuWillOpen_(self, menu):
+        self.is_open = True
+        self.open_callback()
+
+    def menuDidClose_(self, menu):
+        self.is_open = False
 
 
 _REFRESH_SECS = 300
+_REFRESH_CLICK_DEBOUNCE_SECS = 0.5
 
 
 class UsageApp(_rumps.App):
@@ -92,7 +147,11 @@ class UsageApp(_rumps.App):
         self.__stat_menu_items = []
         for x in range(_STAT_LEN):
             for y in range(_STAT_TEXT_LEN):
-                self.__stat_menu_items.append(formatted_menu_item(_PLACEHOLDER_TEXT))
+                self.__stat_menu_items.append(placeholder_menu_item())
+        # the (text, color) last rendered into each stat menu item, so unchanged items are not redrawn
+        self.__stat_menu_texts: list[tuple[str, Color]] = [
+            (_PLACEHOLDER_TEXT, Color.BLUE)
+        ] * len(self.__stat_menu_items)
         self.__status_menu_item = _rumps.MenuItem("Loading...")
         self.menu.add(self.__status_menu_item)
         for i in range(0, len(self.__stat_menu_items), _STAT_TEXT_LEN):
@@ -101,57 +160,103 @@ class UsageApp(_rumps.App):
             self.menu.add(_rumps.separator)
         self.__refresh_menu_item = _rumps.MenuItem("Refresh")
         self.menu.add(self.__refresh_menu_item)
-
-        # setup threadpool to get the update
-        self.__pool = _futures.ThreadPoolExecutor(max_workers=1)
+        self.__last_refresh_click = 0.0
+
+        # stat items are only redrawn while the menu is open, a result fetched while closed waits for it to open
+        self.__unapplied_result: FetchResult | None = None
+        # `NSMenu` only holds a weak reference to its delegate
+        self.__menu_delegate = MenuVisibilityDelegate.alloc().initWithOpenCallback_(
+            self.__menu_will_open
+        )
+        self.menu._menu.setDelegate_(self.__menu_delegate)
+
+        # setup a long-lived worker thread to get the updates
+        self.__pending = False
+        self.__fetch_requests = _queue.SimpleQueue()
+        _threading.Thread(
+            target=self.__fetch_loop, name="fetch_stats", daemon=True
+        ).start()
         self.__run_update()
 
-        # set up UI update
-        self.__update_ui_timer = _rumps.Timer(self.__update_ui, 1)
-        self.__update_ui_timer.start()
-
         # set up refresh
         self.__refresh_timer = _rumps.Timer(self.__refresh, _REFRESH_SECS)
         self.__refresh_timer.start()
 
     @_rumps.clicked("Refresh")
     def __click_refresh(self, _: _rumps.MenuItem):
+        # coalesce rapid clicks into a single refresh
+        now = _time.monotonic()
+        if now - self.__last_refresh_click < _REFRESH_CLICK_DEBOUNCE_SECS:
+            return
+        self.__last_refresh_click = now
         self.__refresh()
 
     def __run_update(self):
-        """Spawns a task to fetch battery status unconditionally."""
-        self.__pending = self.__pool.submit(fetch_stats)
+        """Requests a fetch of battery status unconditionally, the UI is updated once it completes."""
+        self.__pending = True
+        self.__fetch_requests.put(None)
+
+    def __fetch_loop(self):
+        # this runs on the worker thread, but the menu can only be updated on the main thread
+        while True:
+            self.__fetch_requests.get()
+            try:
+                result = fetch_stats()
+            except Exception as e:
+                AppHelper.callAfter(self.__update_error, e)
+            else:
+                AppHelper.callAfter(self.__update_ui, result)
+
+    def __update_ui(self, result: FetchResult):
+        self.__unapplied_result = result
+        try:
+            if self.__menu_delegate.is_open:
+                self.__apply_result()
+            self.__status_menu_item.title = f"Updated: {now_str()}"
+        except Exception as e:
+            self.__status_menu_item.title = f"Error: {now_str()} - {str(e)}"
+        # reset for refresh
+        self.__pending = False
 
-    def __update_ui(self, timer: _rumps.Timer):
-        if self.__pending is None or not self.__pending.done():
+    def __menu_will_open(self):
+        if self.__unapplied_result is None:
             return
         try:
-            result: FetchResult = self.__pending.result()
-            for i, (line, menu_item) in enumerate(
-                zip(result.stat_lines, self.__stat_menu_items)
-            ):
-                # highlight the charge stat line if it is current and we're on battery
-                if (
-                    result.charge_event.type == _core.ChargeType.BATT
-                    and i < _STAT_TEXT_LEN
-                ):
-                    color = Color.RED
-                else:
-                    color = Color.BLUE
-                update_formatted_menu_item(menu_item, line, color)
-            self.__status_menu_item.title = f"Updated: {now_str()}"
+            self.__apply_result()
         except Exception as e:
             self.__status_menu_item.title = f"Error: {now_str()} - {str(e)}"
+
+    def __apply_result(self):
+        """Redraws the stat menu items from the last fetched result."""
+        result = self.__unapplied_result
+        self.__unapplied_result = None
+        lines = result.stat_lines
+        # highlight the current session's lines if we're on battery
+        if result.charge_event.type == _core.ChargeType.BATT:
+            current_color = Color.RED
+        else:
+            current_color = Color.BLUE
+        for i in range(_STAT_TEXT_LEN):
+            self.__update_stat_menu_item(i, lines[i], current_color)
+        for i in range(_STAT_TEXT_LEN, len(self.__stat_menu_items)):
+            self.__update_stat_menu_item(i, lines[i], Color.BLUE)
+
+    def __update_stat_menu_item(self, i: int, text: str, color: Color):
+        if self.__stat_menu_texts[i] == (text, color):
+            return
+        update_formatted_menu_item(self.__stat_menu_items[i], text, color)
+        self.__stat_menu_texts[i] = (text, color)
+
+    def __update_error(self, e: Exception):
+        self.__status_menu_item.title = f"Error: {now_str()} - {str(e)}"
         # reset for refresh
-        timer.stop()
-        self.__pending = None
+        self.__pending = False
 
     def __refresh(self, _: _rumps.Timer | None = None):
-        if self.__pending is not None:
+        if self.__pending:
             return
         self.__status_menu_item.title = f"Loading at {now_str()}..."
         self.__run_update()
-        self.__update_ui_timer.start()
 
 
 def main():
@@ -4,6 +4,45 @@ import collections.abc as _coll_abc
 from mac_battery_usage.core import *
 
 from dataclasses import dataclass
+from datetime import datetime
+
+
+@pytest.mark.parametrize(
+    "ts_text",
+    (
+        "2023-03-13 20:02:28 -0700",
+        "2023-11-05 01:59:59 -0800",
+        "2024-01-01 00:00:00 +0000",
+        "2024-06-30 23:15:07 +0530",
+        "2024-06-30 23:15:07 -0930",
+    ),
+)
+def test_parse_ts(ts_text: str):
+    assert datetime.strptime(ts_text, "%Y-%m-%d %H:%M:%S %z") == parse_ts(ts_text)
+    assert (
+        datetime.strptime(ts_text, "%Y-%m-%d %H:%M:%S %z").utcoffset()
+        == parse_ts(ts_text).utcoffset()
+    )
+
+
+# the parsed form of every timestamp used by the cases below, so each is only parsed once
+_TS = {
+    ts_text: parse_ts(ts_text)
+    for ts_text in (
+        "2023-03-13 14:43:29 -0700",
+        "2023-03-13 15:06:22 -0700",
+        "2023-03-13 15:38:02 -0700",
+        "2023-03-13 15:38:12 -0700",
+        "2023-03-13 15:55:02 -0700",
+        "2023-03-13 16:28:05 -0700",
+        "2023-03-13 16:47:35 -0700",
+        "2023-03-13 17:01:26 -0700",
+        "2023-03-13 19:18:29 -0700",
+        "2023-03-13 19:18:34 -0700",
+        "2023-03-13 20:02:28 -0700",
+        "2023-03-13 20:02:29 -0700",
+    )
+}
 
 
 @dataclass
@@ -21,21 +60,30 @@ _SINGLE_AC_CASE = EventCase(
     log_lines=(
         "2023-03-13 20:02:28 -0700 Assertions           Summary- [System: PrevIdle] Using AC(Charge: 36)",
     ),
-    events=(ChargeEvent(parse_ts("2023-03-13 20:02:28 -0700"), ChargeType.AC, 36),),
+    events=(ChargeEvent(_TS["2023-03-13 20:02:28 -0700"], ChargeType.AC, 36),),
 )
 _SINGLE_BATT_1_CASE = EventCase(
     desc="single BATT event (1)",
     log_lines=(
         "2023-03-13 20:02:28 -0700 Assertions           Summary- [System: PrevIdle] Using Batt(Charge: 36)",
     ),
-    events=(ChargeEvent(parse_ts("2023-03-13 20:02:28 -0700"), ChargeType.BATT, 36),),
+    events=(ChargeEvent(_TS["2023-03-13 20:02:28 -0700"], ChargeType.BATT, 36),),
 )
 _SINGLE_BATT_2_CASE = EventCase(
     desc="single BATT event (2)",
     log_lines=(
         "2023-03-13 20:02:28 -0700 Assertions           Summary- [System: PrevIdle] Using BATT(Charge: 36)",
     ),
-    events=(ChargeEvent(parse_ts("2023-03-13 20:02:28 -0700"), ChargeType.BATT, 36),),
+    events=(ChargeEvent(_TS["2023-03-13 20:02:28 -0700"], ChargeType.BATT, 36),),
+)
+_IGNORED_LINES_CASE = EventCase(
+    desc="ignored lines",
+    log_lines=(
+        "2023-03-13 20:02:28 -0700 Sleep               Entering Sleep state due to 'Idle Sleep'",
+        "2023-03-13 20:02:29 -0700 Notification        Display is turned on",
+        "Total Sleep/Wakes since boot:3",
+    ),
+    events=(DisplayEvent(_TS["2023-03-13 20:02:29 -0700"], DisplayState.ON),),
 )
 _SAMPLE_CASE = EventCase(
     desc="mixed sample",
@@ -53,24 +101,30 @@ _SAMPLE_CASE = EventCase(
         "2023-03-13 19:18:34 -0700 Assertions          Summary- [System: PrevIdle] Using Batt(Charge: 36)",
     ),
     events=(
-        ChargeEvent(parse_ts("2023-03-13 14:43:29 -0700"), ChargeType.AC, 100),
-        DisplayEvent(parse_ts("2023-03-13 15:06:22 -0700"), DisplayState.OFF),
-        DisplayEvent(parse_ts("2023-03-13 15:06:22 -0700"), DisplayState.ON),
-        ChargeEvent(parse_ts("2023-03-13 15:38:02 -0700"), ChargeType.AC, 100),
-        DisplayEvent(parse_ts("2023-03-13 15:38:12 -0700"), DisplayState.OFF),
-        DisplayEvent(parse_ts("2023-03-13 15:55:02 -0700"), DisplayState.ON),
-        DisplayEvent(parse_ts("2023-03-13 16:28:05 -0700"), DisplayState.OFF),
-        DisplayEvent(parse_ts("2023-03-13 16:47:35 -0700"), DisplayState.ON),
-        ChargeEvent(parse_ts("2023-03-13 17:01:26 -0700"), ChargeType.BATT, 100),
-        DisplayEvent(parse_ts("2023-03-13 19:18:29 -0700"), DisplayState.OFF),
-        ChargeEvent(parse_ts("2023-03-13 19:18:34 -0700"), ChargeType.BATT, 36),
+        ChargeEvent(_TS["2023-03-13 14:43:29 -0700"], ChargeType.AC, 100),
+        DisplayEvent(_TS["2023-03-13 15:06:22 -0700"], DisplayState.OFF),
+        DisplayEvent(_TS["2023-03-13 15:06:22 -0700"], DisplayState.ON),
+        ChargeEvent(_TS["2023-03-13 15:38:02 -0700"], ChargeType.AC, 100),
+        DisplayEvent(_TS["2023-03-13 15:38:12 -0700"], DisplayState.OFF),
+        DisplayEvent(_TS["2023-03-13 15:55:02 -0700"], DisplayState.ON),
+        DisplayEvent(_TS["2023-03-13 16:28:05 -0700"], DisplayState.OFF),
+        DisplayEvent(_TS["2023-03-13 16:47:35 -0700"], DisplayState.ON),
+        ChargeEvent(_TS["2023-03-13 17:01:26 -0700"], ChargeType.BATT, 100),
+        DisplayEvent(_TS["2023-03-13 19:18:29 -0700"], DisplayState.OFF),
+        ChargeEvent(_TS["2023-03-13 19:18:34 -0700"], ChargeType.BATT, 36),
     ),
 )
 
 
 @pytest.mark.parametrize(
     "case",
-    (_SINGLE_AC_CASE, _SINGLE_BATT_1_CASE, _SINGLE_BATT_2_CASE, _SAMPLE_CASE),
+    (
+        _SINGLE_AC_CASE,
+        _SINGLE_BATT_1_CASE,
+        _SINGLE_BATT_2_CASE,
+        _IGNORED_LINES_CASE,
+        _SAMPLE_CASE,
+    ),
     ids=EventCase.__str__,
 )
 def test_event_parsing(case: EventCase):
@@ -90,35 +144,60 @@ class UsageCase:
 _NO_DISPLAY_USAGE_CASE = UsageCase(
     desc="no display events",
     events=(
-        ChargeEvent(parse_ts("2023-03-13 15:38:02 -0700"), ChargeType.AC, 100),
-        ChargeEvent(parse_ts("2023-03-13 19:18:34 -0700"), ChargeType.BATT, 36),
+        ChargeEvent(_TS["2023-03-13 15:38:02 -0700"], ChargeType.AC, 100),
+        ChargeEvent(_TS["2023-03-13 19:18:34 -0700"], ChargeType.BATT, 36),
     ),
     stats=Exception("Could not find any start of AC/Battery session in log events"),
 )
 _NO_CHARGE_USAGE_CASE = UsageCase(
     desc="no charge events",
     events=(
-        DisplayEvent(parse_ts("2023-03-13 15:38:12 -0700"), DisplayState.OFF),
-        DisplayEvent(parse_ts("2023-03-13 15:55:02 -0700"), DisplayState.ON),
-        DisplayEvent(parse_ts("2023-03-13 16:28:05 -0700"), DisplayState.OFF),
-        DisplayEvent(parse_ts("2023-03-13 16:47:35 -0700"), DisplayState.ON),
+        DisplayEvent(_TS["2023-03-13 15:38:12 -0700"], DisplayState.OFF),
+        DisplayEvent(_TS["2023-03-13 15:55:02 -0700"], DisplayState.ON),
+        DisplayEvent(_TS["2023-03-13 16:28:05 -0700"], DisplayState.OFF),
+        DisplayEvent(_TS["2023-03-13 16:47:35 -0700"], DisplayState.ON),
     ),
     stats=Exception("Could not find any start of AC/Battery session in log events"),
 )
 _EXACTLY_ONE_OF_EACH_USAGE_CASE = UsageCase(
     desc="one charge and one display event",
     events=(
-        ChargeEvent(parse_ts("2023-03-13 15:38:02 -0700"), ChargeType.AC, 100),
-        DisplayEvent(parse_ts("2023-03-13 16:47:35 -0700"), DisplayState.ON),
+        ChargeEvent(_TS["2023-03-13 15:38:02 -0700"], ChargeType.AC, 100),
+        DisplayEvent(_TS["2023-03-13 16:47:35 -0700"], DisplayState.ON),
+    ),
+    stats=Exception("Could not find any start of AC/Battery session in log events"),
+)
+_SAMPLE_USAGE_CASE = UsageCase(
+    desc="mixed sample",
+    events=_SAMPLE_CASE.events,
+    stats=(
+        UsageSession(
+            start_event=ChargeEvent(
+                _TS["2023-03-13 17:01:26 -0700"], ChargeType.BATT, 100
+            ),
+            end_event=ChargeEvent(
+                _TS["2023-03-13 19:18:34 -0700"], ChargeType.BATT, 36
+            ),
+            display_usage_secs=(5.0, 8223.0),
+            display_usage_charges=pytest.approx((64 * 5 / 8228, 64 * 8223 / 8228)),
+        ),
+    ),
+)
+_NO_TRANSITION_USAGE_CASE = UsageCase(
+    desc="no charge type transition",
+    events=(
+        ChargeEvent(_TS["2023-03-13 15:38:02 -0700"], ChargeType.AC, 90),
+        DisplayEvent(_TS["2023-03-13 16:47:35 -0700"], DisplayState.ON),
+        ChargeEvent(_TS["2023-03-13 19:18:34 -0700"], ChargeType.AC, 100),
     ),
     stats=Exception("Could not find any start of AC/Battery session in log events"),
 )
 # _NO_DISPLAY_BEFORE_CHARGE_SESSION_USAGE_CASE = UsageCase(
 #     desc="no display before session",
 #     events=(
-#         ChargeEvent(parse_ts("2023-03-13 15:38:02 -0700"), ChargeType.AC, 100),
-#         DisplayEvent(parse_ts("2023-03-13 16:47:35 -0700"), DisplayState.ON),
-#         ChargeEvent(parse_ts("2023-03-13 19:18:34 -0700"), ChargeType.BATT, 36),
+#         ChargeEvent(_TS["2023-03-13 15:38:02 -0700"], ChargeType.AC, 100),
+#         DisplayEvent(_TS["2023-03-13 16:47:35 -0700"], DisplayState.ON),
+#         ChargeEvent(_TS["2023-03-13 19:18:34 -0700"], ChargeType.BATT, 36),
 #     ),
 #     stats=Exception("Could not find any start of AC/Battery session in log events"),
 # )
@@ -130,6 +209,8 @@ _EXACTLY_ONE_OF_EACH_USAGE_CASE = UsageCase(
         _NO_DISPLAY_USAGE_CASE,
         _NO_CHARGE_USAGE_CASE,
         _EXACTLY_ONE_OF_EACH_USAGE_CASE,
+        _NO_TRANSITION_USAGE_CASE,
+        _SAMPLE_USAGE_CASE,
         # _NO_DISPLAY_BEFORE_CHARGE_SESSION_USAGE_CASE,
     ),
     ids=UsageCase.__str__,
@@ -140,3 +221,85 @@ def test_usage_session(case: UsageCase):
     except Exception as e:
         assert type(case.stats) == type(e)
         assert case.stats.args == e.args
+
+
+@dataclass
+class PsCase:
+    desc: str
+    text: str
+    charge_type: ChargeType
+    charge: int
+
+    def __str__(self) -> str:
+        return self.desc
+
+
+_PS_BATT_CASE = PsCase(
+    desc="on battery",
+    text=(
+        "Now drawing from 'Battery Power'\n"
+        " -InternalBattery-0 (id=1234567)\t36%; discharging; 3:10 remaining present: true\n"
+    ),
+    charge_type=ChargeType.BATT,
+    charge=36,
+)
+_PS_AC_CASE = PsCase(
+    desc="on AC",
+    text=(
+        "Now drawing from 'AC Power'\n"
+        " -InternalBattery-0 (id=1234567)\t100%; charged; 0:00 remaining present: true\n"
+    ),
+    charge_type=ChargeType.AC,
+    charge=100,
+)
+_PS_FALLBACK_CASE = PsCase(
+    desc="case-insensitive fallback",
+    text=(
+        "now drawing from 'Battery Power'\n"
+        " -InternalBattery-0 (id=1234567)\t5%; discharging; 0:12 remaining present: true\n"
+    ),
+    charge_type=ChargeType.BATT,
+    charge=5,
+)
+
+
+@pytest.mark.parametrize(
+    "case",
+    (_PS_BATT_CASE, _PS_AC_CASE, _PS_FALLBACK_CASE),
+    ids=PsCase.__str__,
+)
+def test_ps_parsing(case: PsCase):
+    event = parse_ps(case.text)
+    assert case.charge_type == event.type
+    assert case.charge == event.charge
+
+
+def test_ps_parsing_failure():
+    with pytest.raises(Exception, match="Could not determine battery status"):
+        parse_ps("No battery present\n")
+
+
+@pytest.mark.parametrize(
+    "total_secs, text",
+    (
+        (0.0, " 0d 00h 00m"),
+        (59.9, " 0d 00h 00m"),
+        (3599.99, " 0d 00h 59m"),
+        (8228.0, " 0d 02h 17m"),
+        (86400.0, " 1d 00h 00m"),
+        (1234567.0, "14d 06h 56m"),
+    ),
+)
+def test_format_secs(total_secs: float, text: str):
+    assert text == format_secs(total_secs)
+
+
+def test_pretty_lines():
+    (stat,) = calculate_usage(_SAMPLE_CASE.events)
+    lines = (
+        "Battery session at 2023-03-13 17:01:26 for  0d 02h 17m from 100%",
+        "Screen on  used 64% battery during  0d 02h 17m at 28.0%/h (≅ 0d 03h 34m per charge)",
+        "Screen off used  0% battery during  0d 00h 00m at  0.0%/h",
+    )
+    assert lines == stat.pretty_lines()
+    assert "\n".join(lines) == stat.pretty_str()